@@ -0,0 +1,264 @@
+"""
+maze_core.py
+Compiled maze kernels shared by maze_tool.py and app_streamlit_maze.py.
+
+Cells live in a uint8[height, width] array (flat index = y * width + x).
+Bit d of a cell is set when the passage towards direction d
+(N=0, E=1, S=2, W=3) is open.
+"""
+
+import functools
+from collections import namedtuple
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # fallback: run the kernels as plain Python
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+# Directions: N=0, E=1, S=2, W=3
+DX = (0, 1, 0, -1)
+DY = (-1, 0, 1, 0)
+
+# Direction bits of a cell mask
+N, E, S, W = 1, 2, 4, 8
+BIT = (N, E, S, W)   # BIT[d]: bit of direction d
+OPP = (S, W, N, E)   # OPP[d]: bit of the direction opposite d
+
+# JSON "directions" fragment for each 4-bit mask, e.g. DIR_STR[5] == "[1, 0, 1, 0]"
+DIR_STR = [f"[{m & 1}, {m >> 1 & 1}, {m >> 2 & 1}, {m >> 3 & 1}]" for m in range(16)]
+
+
+def _wall_svg(mask: int) -> str:
+    line = '<line x1="{}" y1="{}" x2="{}" y2="{}" stroke="black" stroke-width="{{w}}" />'
+    walls = []
+    if not mask & N: walls.append(line.format("{x0}", "{y0}", "{x1}", "{y0}"))
+    if not mask & E: walls.append(line.format("{x1}", "{y0}", "{x1}", "{y1}"))
+    if not mask & S: walls.append(line.format("{x0}", "{y1}", "{x1}", "{y1}"))
+    if not mask & W: walls.append(line.format("{x0}", "{y0}", "{x0}", "{y1}"))
+    return "\n".join(walls)
+
+
+# SVG walls still standing for each 4-bit mask; fill in {w} (stroke width),
+# then {x0},{y0} (top-left) and {x1},{y1} (bottom-right) of the cell
+WALL_SVG = [_wall_svg(m) for m in range(16)]
+
+
+# ---------------- Maze generator (iterative DFS backtracker) -------
+@njit(cache=True)
+def _carve(w, h, rnd, dirs_out, stack):
+    """Carve a perfect maze from (0,0) into dirs_out (flat, len w*h).
+
+    rnd holds one uniform [0, 1) draw per carved passage (w*h - 1 of them).
+    Returns the flat index of the deepest cell on the DFS stack, which is the
+    cell farthest from (0,0) along the spanning tree.
+    """
+    visited = np.zeros(w * h, dtype=np.uint8)
+    neighbors = np.empty(4, dtype=np.int32)
+
+    visited[0] = 1
+    stack[0] = 0
+    top = 1
+    best = 0
+    best_top = 1
+    k = 0
+    while top > 0:
+        idx = stack[top - 1]
+        x = idx % w
+        y = idx // w
+        n = 0
+        for d in range(4):
+            nx = x + DX[d]
+            ny = y + DY[d]
+            if nx >= 0 and nx < w and ny >= 0 and ny < h and visited[ny * w + nx] == 0:
+                neighbors[n] = d
+                n += 1
+
+        if n == 0:
+            top -= 1
+            continue
+
+        d = neighbors[int(rnd[k] * n)]
+        k += 1
+        nidx = (y + DY[d]) * w + x + DX[d]
+        visited[nidx] = 1
+        # carve passage
+        dirs_out[idx] |= BIT[d]
+        dirs_out[nidx] |= OPP[d]
+        stack[top] = nidx
+        top += 1
+        if top > best_top:
+            best_top = top
+            best = nidx
+
+    return best
+
+
+# Pure-Python twin of _carve used when Numba is missing (e.g. a frozen build
+# without it). Sizes are inlined per shape so the loop has no w/h lookups.
+_CARVE_TEMPLATE = """
+def carve(rnd):
+    step = (-{W}, 1, {W}, -1)
+    bit = BIT
+    opp = OPP
+    dirs = [0] * {CELLS}
+    visited = [False] * {CELLS}
+    visited[0] = True
+    stack = [0]
+    stack_append = stack.append
+    stack_pop = stack.pop
+    best = 0
+    best_depth = 1
+    k = 0
+    while stack:
+        idx = stack[-1]
+        x = idx % {W}
+        neighbors = []
+        if idx >= {W} and not visited[idx - {W}]: neighbors.append(0)
+        if x < {W1} and not visited[idx + 1]: neighbors.append(1)
+        if idx < {LAST_ROW} and not visited[idx + {W}]: neighbors.append(2)
+        if x > 0 and not visited[idx - 1]: neighbors.append(3)
+        if not neighbors:
+            stack_pop()
+            continue
+        d = neighbors[int(rnd[k] * len(neighbors))]
+        k += 1
+        nidx = idx + step[d]
+        visited[nidx] = True
+        # carve passage
+        dirs[idx] |= bit[d]
+        dirs[nidx] |= opp[d]
+        stack_append(nidx)
+        if len(stack) > best_depth:
+            best_depth = len(stack)
+            best = nidx
+    return dirs, best
+"""
+
+
+@functools.lru_cache(maxsize=32)
+def _compiled_carve(W: int, H: int):
+    """Return carve(rnd) -> (flat masks, deepest idx), specialized for a W x H maze."""
+    src = _CARVE_TEMPLATE.format(W=W, W1=W - 1, CELLS=W * H, LAST_ROW=W * H - W)
+    ns = {"BIT": BIT, "OPP": OPP}
+    exec(compile(src, f"<carve {W}x{H}>", "exec"), ns)
+    return ns["carve"]
+
+
+def carve(width: int, height: int, seed: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Carve a maze from (0,0).
+
+    Returns the uint8[height, width] direction bitmasks and the (x, y) of the
+    cell farthest from (0,0), valid as long as no loops are added afterwards.
+    Both the Numba kernel and the pure-Python fallback consume the same
+    pre-drawn random stream, so a seed gives the same maze either way.
+    """
+    rnd = np.random.default_rng(seed & 0xFFFFFFFF).random(width * height - 1)
+    if not HAVE_NUMBA:
+        cells, best = _compiled_carve(width, height)(rnd.tolist())
+        dirs = np.array(cells, dtype=np.uint8)
+    else:
+        dirs = np.zeros(width * height, dtype=np.uint8)
+        stack = np.empty(width * height, dtype=np.int32)
+        best = int(_carve(width, height, rnd, dirs, stack))
+    return dirs.reshape(height, width), (best % width, best // width)
+
+
+# ---------------- Loops (wall removal) ------------------------------
+def open_walls(dirs: np.ndarray, count: int, rng: np.random.Generator) -> None:
+    """Open up to `count` random interior walls of dirs (in place)."""
+    h, w = dirs.shape
+    flat = dirs.reshape(-1)
+    idx = np.arange(w * h, dtype=np.int32).reshape(h, w)
+    # every interior edge once: east edges (d=1) then south edges (d=2)
+    idx_a = np.concatenate((idx[:, :-1].ravel(), idx[:-1, :].ravel()))
+    d = np.concatenate((np.full(h * (w - 1), 1, np.int32), np.full((h - 1) * w, 2, np.int32)))
+    idx_b = idx_a + np.where(d == 1, 1, w).astype(np.int32)
+
+    bit = np.array(BIT, dtype=np.uint8)
+    opp = np.array(OPP, dtype=np.uint8)
+    closed = (flat[idx_a] & bit[d]) == 0
+    idx_a, idx_b, d = idx_a[closed], idx_b[closed], d[closed]
+    sel = rng.permutation(len(d))[:count]
+
+    # .at: a cell can own both a selected east and a selected south edge
+    np.bitwise_or.at(flat, idx_a[sel], bit[d[sel]])
+    np.bitwise_or.at(flat, idx_b[sel], opp[d[sel]])
+
+
+# ---------------- Farthest cell (BFS) -------------------------------
+@njit(cache=True)
+def _farthest(dirs, w, h, sx, sy):
+    """BFS from (sx,sy) over flat dirs; return the (x, y) farthest from it."""
+    dist = np.full(w * h, -1, np.int32)
+    q = np.empty(w * h, np.int32)   # every cell is queued at most once
+    start = sy * w + sx
+    dist[start] = 0
+    q[0] = start
+    head = 0
+    tail = 1
+    best = start
+
+    while head < tail:
+        idx = q[head]
+        head += 1
+        d = dist[idx]
+        if d > dist[best]:
+            best = idx
+        m = dirs[idx]
+        x = idx % w
+        if m & N and idx >= w and dist[idx - w] < 0:
+            dist[idx - w] = d + 1
+            q[tail] = idx - w
+            tail += 1
+        if m & E and x < w - 1 and dist[idx + 1] < 0:
+            dist[idx + 1] = d + 1
+            q[tail] = idx + 1
+            tail += 1
+        if m & S and idx + w < w * h and dist[idx + w] < 0:
+            dist[idx + w] = d + 1
+            q[tail] = idx + w
+            tail += 1
+        if m & W and x > 0 and dist[idx - 1] < 0:
+            dist[idx - 1] = d + 1
+            q[tail] = idx - 1
+            tail += 1
+
+    return int(best % w), int(best // w)
+
+
+def farthest_cell(dirs: np.ndarray, start: Tuple[int, int]) -> Tuple[int, int]:
+    """Return the (x, y) farthest from start (BFS over the uint8[height, width] dirs)."""
+    h, w = dirs.shape
+    sx, sy = start
+    # _farthest is compiled without bounds checks; a bad start would write out of range
+    if not (0 <= sx < w and 0 <= sy < h):
+        raise ValueError(f"start {tuple(start)} is outside the {w}x{h} maze")
+    return _farthest(dirs.reshape(-1), w, h, sx, sy)
+
+
+# ---------------- Maze container ------------------------------------
+class MazeData(namedtuple("MazeData", "width height dirs start end loops")):
+    """A generated maze; dirs is the uint8[height, width] bitmask array."""
+    __slots__ = ()
+
+    def to_cells_list(self) -> List[Dict]:
+        """Legacy form: [{'position':[x,y], 'directions':[N,E,S,W]}, ...]
+
+        Cells come out in row-major order, so cells[i] is at
+        (x, y) == divmod(i, width)[::-1] and callers need not read "position".
+        """
+        cells = []
+        for y, row in enumerate(self.dirs.tolist()):
+            for x, d in enumerate(row):
+                cells.append({"position": [x, y],
+                              "directions": [d & 1, (d >> 1) & 1, (d >> 2) & 1, (d >> 3) & 1]})
+        return cells
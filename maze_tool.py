@@ -4,14 +4,17 @@ maze_tool.py
 Generate a maze-like grid (N,E,S,W = 1=open, 0=wall) and export to JSON.
 """
 
+import io
 import json
 import random
 import time
 import argparse
 import sys
 import os
-from typing import List, Dict
-from collections import deque
+
+import numpy as np
+
+from maze_core import DIR_STR, E, S, WALL_SVG, MazeData, carve, farthest_cell, open_walls
 
 # ----------------------------------------------------------------------
 # Python version check (secrets added in 3.6)
@@ -25,160 +28,50 @@ except ImportError:  # fallback (should not happen on 3.6+)
     secrets = None
 
 # ---------------- Maze generator (iterative DFS backtracker) -------
-DX = [0, 1, 0, -1]   # N, E, S, W
-DY = [-1, 0, 1, 0]
-
-
-def generate_maze(width: int, height: int, seed: int = None) -> List[Dict]:
-    """Return a list of cell dicts: {'position':[x,y], 'directions':[N,E,S,W]}"""
+def generate_maze(width: int, height: int, seed: int = None) -> tuple[np.ndarray, tuple[int, int]]:
+    """Return a uint8[height, width] array of direction bitmasks (bit d = open towards d)
+    and the cell farthest from (0,0) in the (loop-free) maze."""
     if seed is not None:
         random.seed(seed)
 
-    grid = [[None for _ in range(width)] for _ in range(height)]
-
-    def make_cell(x: int, y: int) -> Dict:
-        return {"position": [x, y], "directions": [0, 0, 0, 0]}
-
-    # start at (0,0) – deterministic
-    sx, sy = 0, 0
-    grid[sy][sx] = make_cell(sx, sy)
-    stack: List[tuple[int, int]] = [(sx, sy)]
-
-    while stack:
-        x, y = stack[-1]
-        neighbors = []
-        for d in range(4):
-            nx = x + DX[d]
-            ny = y + DY[d]
-            if 0 <= nx < width and 0 <= ny < height and grid[ny][nx] is None:
-                neighbors.append(d)
-
-        if not neighbors:
-            stack.pop()
-            continue
-
-        d = random.choice(neighbors)
-        nx = x + DX[d]
-        ny = y + DY[d]
-
-        grid[ny][nx] = make_cell(nx, ny)
-        # carve passage
-        grid[y][x]["directions"][d] = 1
-        grid[ny][nx]["directions"][(d + 2) % 4] = 1
-
-        stack.append((nx, ny))
-
-    # Flatten (defensive – every cell should exist)
-    cells = []
-    for y in range(height):
-        for x in range(width):
-            cell = grid[y][x]
-            if cell is None:                     # should never happen
-                cell = make_cell(x, y)
-            cells.append(cell)
-    return cells
-
-def add_loops(cells: List[Dict], width: int, height: int, loop_factor: float) -> None:
+    # start at (0,0) – deterministic; carving runs in the compiled kernel
+    return carve(width, height, random.getrandbits(32))
+
+def add_loops(dirs: np.ndarray, width: int, height: int, loop_factor: float) -> None:
     """Add loops by randomly removing walls between adjacent cells."""
     total_loops = int(width * height * loop_factor)
-    grid = [[None for _ in range(width)] for _ in range(height)]
-    for cell in cells:
-        x, y = cell["position"]
-        grid[y][x] = cell
-
-    attempts = 0
-    max_attempts = total_loops * 10  # prevent infinite loops if no walls to remove
-    loops_added = 0
-
-    while loops_added < total_loops and attempts < max_attempts:
-        x = random.randint(0, width - 1)
-        y = random.randint(0, height - 1)
-        cell = grid[y][x]
-        # Find neighbors that are adjacent but not connected (wall between)
-        candidates = []
-        for d in range(4):
-            nx = x + DX[d]
-            ny = y + DY[d]
-            if 0 <= nx < width and 0 <= ny < height:
-                neighbor = grid[ny][nx]
-                if cell["directions"][d] == 0:
-                    candidates.append(d)
-        if candidates:
-            d = random.choice(candidates)
-            nx = x + DX[d]
-            ny = y + DY[d]
-            neighbor = grid[ny][nx]
-            # Remove wall between cell and neighbor
-            cell["directions"][d] = 1
-            neighbor["directions"][(d + 2) % 4] = 1
-            loops_added += 1
-        attempts += 1
-
-
-def find_farthest_cell(cells: List[Dict], width: int, height: int, start: tuple[int, int]) -> tuple[int, int]:
-    """Find the farthest cell from start using BFS."""
-    grid = [[None for _ in range(width)] for _ in range(height)]
-    for cell in cells:
-        x, y = cell["position"]
-        grid[y][x] = cell
+    open_walls(dirs, total_loops, np.random.default_rng(random.getrandbits(32)))
 
-    visited = [[False for _ in range(width)] for _ in range(height)]
-    queue = deque()
-    queue.append((start[0], start[1], 0))  # x, y, distance
-    visited[start[1]][start[0]] = True
 
-    farthest_cell = start
-    max_dist = 0
+def find_farthest_cell(dirs: np.ndarray, width: int, height: int, start: tuple[int, int]) -> tuple[int, int]:
+    """Find the farthest cell from start using BFS."""
+    return farthest_cell(dirs, start)
 
-    while queue:
-        x, y, dist = queue.popleft()
-        if dist > max_dist:
-            max_dist = dist
-            farthest_cell = (x, y)
 
-        cell = grid[y][x]
-        for d in range(4):
-            if cell["directions"][d] == 1:
-                nx = x + DX[d]
-                ny = y + DY[d]
-                if 0 <= nx < width and 0 <= ny < height and not visited[ny][nx]:
-                    visited[ny][nx] = True
-                    queue.append((nx, ny, dist + 1))
+# ---------------- JSON formatting helpers ---------------------------
+def export_compact_lines(data: MazeData) -> str:
+    """Custom compact format: one cell per line, readable JSON."""
+    buf = io.StringIO()
+    w = buf.write
+    w("{\n")
+    w(f'  "width": {data.width},\n')
+    w(f'  "height": {data.height},\n')
+    w('  "cells": [\n')
 
-    return farthest_cell
+    sep = ""  # no trailing comma after the last cell
+    for y, row in enumerate(data.dirs.tolist()):
+        for x, m in enumerate(row):
+            w(f'{sep}    {{ "position": [{x}, {y}], "directions": {DIR_STR[m]} }}')
+            sep = ",\n"
 
+    w("\n  ]\n")
+    w("}")
+    return buf.getvalue()
 
-# ---------------- JSON formatting helpers ---------------------------
-def export_compact_lines(data: Dict) -> str:
-    """Custom compact format: one cell per line, readable JSON."""
-    lines = []
-    lines.append("{")
-    lines.append(f'  "width": {data["width"]},')
-    lines.append(f'  "height": {data["height"]},')
-    lines.append('  "cells": [')
-
-    for i, cell in enumerate(data["cells"]):
-        pos = cell["position"]
-        dirs = cell["directions"]
-        comma = "," if i < len(data["cells"]) - 1 else ""
-        line = f'    {{ "position": [{pos[0]}, {pos[1]}], "directions": [{", ".join(map(str, dirs))}] }}{comma}'
-        lines.append(line)
-
-    lines.append("  ]")
-    lines.append("}")
-    return "\n".join(lines)
-
-
-def export_maze_html(maze: Dict, filename: str) -> None:
-    width = maze["width"]
-    height = maze["height"]
-    cells = maze["cells"]
-
-    # Build a 2D array for quick access: cells[y][x]
-    grid = [[None for _ in range(width)] for _ in range(height)]
-    for cell in cells:
-        x, y = cell["position"]
-        grid[y][x] = cell
+
+def export_maze_html(maze: MazeData, filename: str) -> None:
+    width = maze.width
+    height = maze.height
 
     cell_size = 20
     wall_thickness = 2
@@ -186,7 +79,7 @@ def export_maze_html(maze: Dict, filename: str) -> None:
     svg_height = height * cell_size + wall_thickness
 
     def line(x1, y1, x2, y2):
-        return f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="black" stroke-width="{wall_thickness}"/>'
+        return f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="black" stroke-width="{wall_thickness}" />'
 
     svg_lines = []
     # Draw outer border
@@ -196,28 +89,17 @@ def export_maze_html(maze: Dict, filename: str) -> None:
     svg_lines.append(line(0, svg_height, svg_width, svg_height))  # bottom
 
     # Draw walls inside maze
-    for y in range(height):
-        for x in range(width):
-            cell = grid[y][x]
-            px = x * cell_size
-            py = y * cell_size
-            dirs = cell["directions"]
-            # North wall
-            if dirs[0] == 0:
-                svg_lines.append(line(px, py, px + cell_size, py))
-            # East wall
-            if dirs[1] == 0:
-                svg_lines.append(line(px + cell_size, py, px + cell_size, py + cell_size))
-            # South wall
-            if dirs[2] == 0:
-                svg_lines.append(line(px, py + cell_size, px + cell_size, py + cell_size))
-            # West wall
-            if dirs[3] == 0:
-                svg_lines.append(line(px, py, px, py + cell_size))
+    walls = [t.replace("{w}", str(wall_thickness)) for t in WALL_SVG]
+    for y, row in enumerate(maze.dirs.tolist()):
+        py = y * cell_size
+        for x, mask in enumerate(row):
+            if mask != 15:  # fully open cells draw nothing
+                px = x * cell_size
+                svg_lines.append(walls[mask].format(x0=px, y0=py, x1=px + cell_size, y1=py + cell_size))
 
     # Add circles for start and end positions
-    start = maze.get("start", (0, 0))
-    end = maze.get("end", (width - 1, height - 1))
+    start = maze.start
+    end = maze.end
     cx_start = start[0] * cell_size + cell_size / 2
     cy_start = start[1] * cell_size + cell_size / 2
     cx_end = end[0] * cell_size + cell_size / 2
@@ -244,16 +126,8 @@ def export_maze_html(maze: Dict, filename: str) -> None:
         f.write(html_content)
 
 
-def render_maze_grid(maze: Dict, start: tuple[int, int], end: tuple[int, int]) -> None:
-    width = maze["width"]
-    height = maze["height"]
-    cells = maze["cells"]
-
-    # Build a 2D array for quick access: cells[y][x]
-    grid = [[None for _ in range(width)] for _ in range(height)]
-    for cell in cells:
-        x, y = cell["position"]
-        grid[y][x] = cell
+def render_maze_grid(maze: MazeData, start: tuple[int, int], end: tuple[int, int]) -> None:
+    width = maze.width
 
     # Print top border
     top_line = "+"
@@ -261,13 +135,12 @@ def render_maze_grid(maze: Dict, start: tuple[int, int], end: tuple[int, int]) -
         top_line += "---+"
     print(top_line)
 
-    for y in range(height):
+    for y, row in enumerate(maze.dirs.tolist()):
         # For each row, print the vertical walls and spaces
         line_vert = "|"
         line_horz = "+"
 
-        for x in range(width):
-            cell = grid[y][x]
+        for x, cell in enumerate(row):
             # Space inside cell
             if (x, y) == start:
                 line_vert += " S "
@@ -276,17 +149,16 @@ def render_maze_grid(maze: Dict, start: tuple[int, int], end: tuple[int, int]) -
             else:
                 line_vert += "   "
             # East wall if no passage east
-            if cell["directions"][1] == 1:
+            if cell & E:
                 line_vert += " "
             else:
                 line_vert += "|"
 
         print(line_vert)
 
-        for x in range(width):
-            cell = grid[y][x]
+        for cell in row:
             # South wall if no passage south
-            if cell["directions"][2] == 1:
+            if cell & S:
                 line_horz += "   +"
             else:
                 line_horz += "---+"
@@ -294,26 +166,21 @@ def render_maze_grid(maze: Dict, start: tuple[int, int], end: tuple[int, int]) -
 
 
 # ----------------- CLI & main --------------------------------------
-def build_data(width: int, height: int, seed: int = None, loops: float = 0.0, start_str: str = None, end_str: str = None) -> Dict:
-    cells = generate_maze(width, height, seed)
+def build_data(width: int, height: int, seed: int = None, loops: float = 0.0, start_str: str = None, end_str: str = None) -> MazeData:
+    dirs, deepest = generate_maze(width, height, seed)
     if loops > 0.0:
-        add_loops(cells, width, height, loops)
+        add_loops(dirs, width, height, loops)
     if start_str:
         start = tuple(map(int, start_str.split(',')))
     else:
         start = (0, 0)
     if end_str:
         end = tuple(map(int, end_str.split(',')))
+    elif loops <= 0.0 and start == (0, 0):
+        end = deepest  # the DFS already found it; no BFS needed
     else:
-        end = find_farthest_cell(cells, width, height, start)
-    return {
-        "width": width,
-        "height": height,
-        "cells": cells,
-        "start": start,
-        "end": end,
-        "difficulty": {"loops": loops}
-    }
+        end = find_farthest_cell(dirs, width, height, start)
+    return MazeData(width, height, dirs, start, end, loops)
 
 
 def gen_random_id() -> str:
@@ -362,7 +229,7 @@ def main() -> None:
     export_maze_html(data, html_path)
     print(f"Saved: {html_path}")
 
-    render_maze_grid(data, data["start"], data["end"])
+    render_maze_grid(data, data.start, data.end)
 
 
 if __name__ == "__main__":
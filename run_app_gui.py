@@ -1,3 +1,4 @@
+import errno
 import os
 import threading
 import time
@@ -17,6 +18,31 @@ def is_port_in_use(port):
         return s.connect_ex(('localhost', port)) == 0
 
 
+# --- Helper: Wait until the server accepts connections ---
+def wait_for_port(port, attempts=60, interval=0.5):
+    """Poll `port` with a single non-blocking socket; True once it connects."""
+    def new_socket():
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setblocking(False)
+        return s
+
+    s = new_socket()
+    try:
+        for _ in range(attempts):
+            err = s.connect_ex(('localhost', port))
+            if err == errno.EINVAL:
+                # BSD/macOS will not reuse a socket whose connect failed
+                s.close()
+                s = new_socket()
+                err = s.connect_ex(('localhost', port))
+            if err in (0, errno.EISCONN):
+                return True
+            time.sleep(interval)
+        return False
+    finally:
+        s.close()
+
+
 # --- Run Streamlit server ---
 def run_streamlit():
     """
@@ -71,14 +97,10 @@ def run_streamlit():
 def start_main_app(window):
     """Run inside webview.start() main loop"""
     def delayed_launch():
-        time.sleep(2)
+        time.sleep(0.2)
 
         # Đợi server Streamlit sẵn sàng
-        for _ in range(60):
-            if is_port_in_use(current_port):
-                break
-            time.sleep(0.5)
-        else:
+        if not wait_for_port(current_port):
             print("❌ Streamlit server not ready.")
             window.load_html("<h3>Failed to start Maze Generator</h3>")
             return